@@ -14,9 +14,17 @@ Anthropic APIに最適化された画像を新しいディレクトリに保存
 import os
 import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from PIL import Image
 import logging
+from image_files import SUPPORTED_EXTENSIONS, scan_image_files
+from image_processing import (
+    MAX_FILE_SIZE_BYTES, MAX_DIMENSION, OPTIMAL_QUALITY,
+    resized_size, resize_image, composite_on_white, encode_jpeg_pillow,
+    turbojpeg_available, init_worker, use_turbojpeg, optimize_jpeg_turbo, read_passthrough_jpeg,
+)
 
 # ロギング設定
 logging.basicConfig(
@@ -26,13 +34,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Anthropic APIの制限値
-MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
-MAX_DIMENSION = 1568  # ピクセル単位の最大長辺
-OPTIMAL_QUALITY = 90  # 出力JPEG品質
-
-# サポートされるファイル拡張子
-SUPPORTED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+def _positive_int(value):
+    """argparse用: 1以上の整数に変換する"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"整数を指定してください: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"1以上の整数を指定してください: {value}")
+    return number
 
 def parse_args():
     """コマンドライン引数を解析する"""
@@ -47,93 +57,98 @@ def parse_args():
                         help=f'最大長辺サイズ (pixels, default: {MAX_DIMENSION})')
     parser.add_argument('--recursive', '-r', action='store_true',
                         help='入力ディレクトリを再帰的に処理する')
+    parser.add_argument('--workers', '-w', type=_positive_int, default=None,
+                        help='並列処理するワーカープロセス数 (default: CPUコア数)')
     return parser.parse_args()
 
-def get_image_files(directory, recursive=False):
-    """指定されたディレクトリから画像ファイルのリストを取得する"""
-    directory_path = Path(directory)
-    
-    if not directory_path.exists() or not directory_path.is_dir():
+def _list_image_files(directory, recursive):
+    """画像ファイルのパスとファイルサイズの組をパス順に取得する"""
+    if not os.path.isdir(directory):
         logger.error(f"ディレクトリが見つかりません: {directory}")
         return []
     
-    if recursive:
-        files = []
-        for path in directory_path.rglob('*'):
-            if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
-                files.append(path)
-    else:
-        files = [f for f in directory_path.iterdir() 
-                if f.is_file() and f.suffix.lower() in SUPPORTED_EXTENSIONS]
-    
-    return sorted(files)
+    return sorted(scan_image_files(directory, recursive))
 
-def resize_image(image, max_dimension):
-    """画像を指定された最大長辺に合わせてリサイズする"""
-    width, height = image.size
-    
-    # 既に最大長辺以下ならリサイズ不要
-    if width <= max_dimension and height <= max_dimension:
-        return image
-    
-    # アスペクト比を維持しながらリサイズ
-    if width > height:
-        new_width = max_dimension
-        new_height = int(height * (max_dimension / width))
-    else:
-        new_height = max_dimension
-        new_width = int(width * (max_dimension / height))
-    
-    return image.resize((new_width, new_height), Image.LANCZOS)
+def get_image_files(directory, recursive=False):
+    """指定されたディレクトリから画像ファイルのリストを取得する"""
+    return [path for path, _ in _list_image_files(directory, recursive)]
 
-def optimize_image(input_path, output_path, output_format, quality, max_dimension):
-    """画像を最適化して保存する"""
+def optimize_image(input_path, output_path, output_format, quality, max_dimension, input_size=None):
+    """
+    画像を最適化して保存する
+    
+    出力先のディレクトリは呼び出し側で作成しておくこと。input_sizeを渡すと
+    入力ファイルのサイズ取得（stat）を省略する。
+    """
     try:
-        # 画像を開く
-        with Image.open(input_path) as img:
-            # RGBAモードの画像をRGBに変換（必要な場合）
-            if img.mode == 'RGBA' and output_format.lower() == 'jpg':
-                # 透明部分を白背景で変換
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[3])  # 3はアルファチャンネル
-                img = background
-            
-            # 画像をリサイズ
-            resized_img = resize_image(img, max_dimension)
-            
-            # 出力ディレクトリがなければ作成
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # 保存
-            if output_format.lower() == 'jpg':
-                resized_img = resized_img.convert('RGB')
-                resized_img.save(output_path, format='JPEG', quality=quality, optimize=True)
-            elif output_format.lower() == 'png':
-                resized_img.save(output_path, format='PNG', optimize=True)
-            elif output_format.lower() == 'webp':
-                resized_img.save(output_path, format='WEBP', quality=quality)
-            
-            # ファイルサイズをチェック
-            file_size = os.path.getsize(output_path)
-            if file_size > MAX_FILE_SIZE_BYTES:
-                logger.warning(f"警告: {output_path} のサイズが {file_size/1024/1024:.2f}MB で制限の5MBを超えています")
-            
-            # 元のサイズと最適化後のサイズを比較
-            original_size = os.path.getsize(input_path)
-            compression_ratio = (1 - file_size / original_size) * 100
-            
-            logger.info(f"処理完了: {input_path.name} -> {output_path}")
-            logger.info(f"  元サイズ: {original_size/1024:.1f}KB, 新サイズ: {file_size/1024:.1f}KB " +
-                       f"(圧縮率: {compression_ratio:.1f}%)")
-            return True
+        if input_size is None:
+            input_size = os.stat(input_path).st_size
+        
+        # 要件を満たすJPEGはそのまま使い、それ以外のJPEG→JPEGはPyTurboJPEGで処理する
+        image_data, _ = read_passthrough_jpeg(input_path, output_format, quality, max_dimension, input_size)
+        if image_data is None and use_turbojpeg(input_path, output_format):
+            image_data, _ = optimize_jpeg_turbo(input_path, quality, max_dimension)
+        
+        file_size = None
+        if image_data is not None:
+            with open(output_path, 'wb') as f:
+                f.write(image_data)
+            file_size = len(image_data)
+        else:
+            # 画像を開く
+            with Image.open(input_path) as img:
+                # JPEGはデコード時に1/2・1/4・1/8で縮小させ、デコードとリサイズの処理量を減らす
+                target_size = resized_size(img.width, img.height, max_dimension)
+                if img.format == 'JPEG' and target_size is not None:
+                    img.draft('RGB', target_size)
+                
+                # RGBAモードの画像をRGBに変換（必要な場合）
+                if img.mode == 'RGBA' and output_format.lower() == 'jpg':
+                    # 透明部分を白背景で変換
+                    img = composite_on_white(img)
+                
+                # 画像をリサイズ
+                resized_img = resize_image(img, max_dimension)
+                
+                # 保存
+                if output_format.lower() == 'jpg':
+                    if resized_img.mode != 'RGB':
+                        resized_img = resized_img.convert('RGB')
+                    with encode_jpeg_pillow(resized_img, quality) as encoded, open(output_path, 'wb') as f:
+                        f.write(encoded)
+                        file_size = len(encoded)
+                elif output_format.lower() == 'png':
+                    resized_img.save(output_path, format='PNG', optimize=True)
+                elif output_format.lower() == 'webp':
+                    resized_img.save(output_path, format='WEBP', quality=quality)
+        
+        # ファイルサイズをチェック（Pillowがファイルに直接保存した場合のみstatする）
+        if file_size is None:
+            file_size = os.stat(output_path).st_size
+        if file_size > MAX_FILE_SIZE_BYTES:
+            logger.warning(f"警告: {output_path} のサイズが {file_size/1024/1024:.2f}MB で制限の5MBを超えています")
+        
+        # 元のサイズと最適化後のサイズを比較
+        original_size = input_size
+        compression_ratio = (1 - file_size / original_size) * 100
+        
+        logger.info(f"処理完了: {input_path.name} -> {output_path}")
+        logger.info(f"  元サイズ: {original_size/1024:.1f}KB, 新サイズ: {file_size/1024:.1f}KB " +
+                   f"(圧縮率: {compression_ratio:.1f}%)")
+        return True
             
     except Exception as e:
         logger.error(f"エラー: {input_path} の処理中にエラーが発生しました: {e}")
         return False
 
-def process_directory(input_dir, output_dir, output_format, quality, max_dimension, recursive):
+def _optimize_worker(task, output_format, quality, max_dimension):
+    """ワーカープロセスで1ファイルを最適化する（ProcessPoolExecutor用）"""
+    input_file, output_file, input_size = task
+    return optimize_image(input_file, output_file, output_format, quality, max_dimension, input_size)
+
+def process_directory(input_dir, output_dir, output_format, quality, max_dimension, recursive, workers=None):
     """ディレクトリ内の画像を処理する"""
-    input_files = get_image_files(input_dir, recursive)
+    input_files = _list_image_files(input_dir, recursive)
     
     if not input_files:
         logger.warning(f"処理する画像ファイルがありません: {input_dir}")
@@ -141,16 +156,32 @@ def process_directory(input_dir, output_dir, output_format, quality, max_dimensi
     
     logger.info(f"処理対象のファイル数: {len(input_files)}")
     
-    success_count = 0
-    for input_file in input_files:
-        # 出力パスを計算
-        rel_path = input_file.relative_to(input_dir) if input_file.is_relative_to(input_dir) else Path(input_file.name)
-        output_file = Path(output_dir) / rel_path.with_suffix(f'.{output_format.lower()}')
-        
-        if optimize_image(input_file, output_file, output_format, quality, max_dimension):
-            success_count += 1
+    # 走査したパスは入力ディレクトリで始まるので、相対パスは文字列の切り出しで求める
+    input_root = str(Path(input_dir))
+    prefix_len = 0 if input_root == '.' else len(os.path.join(input_root, ''))
+    
+    # 出力パスを事前に計算し、ワーカーは画像処理のみを行う
+    output_root = Path(output_dir)
+    tasks = []
+    for input_file, input_size in input_files:
+        rel_path = str(input_file)[prefix_len:]
+        output_file = (output_root / rel_path).with_suffix(f'.{output_format.lower()}')
+        tasks.append((input_file, output_file, input_size))
+    
+    # 出力ディレクトリはファイルごとではなく、重複を除いて一度だけ作成する
+    for output_parent in {output_file.parent for _, output_file, _ in tasks}:
+        output_parent.mkdir(parents=True, exist_ok=True)
+    
+    # 各画像の最適化は独立したCPU処理なのでプロセスプールで並列実行する
+    worker = partial(_optimize_worker, output_format=output_format, quality=quality,
+                     max_dimension=max_dimension)
+    # TurboJPEGの可否は親プロセスで一度だけ確認し、ワーカーに引き継ぐ
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_worker,
+                             initargs=(turbojpeg_available(),)) as executor:
+        # 1画像の処理はプロセス間通信より十分重いので、ワーカー間で偏らないよう1件ずつ渡す
+        results = list(executor.map(worker, tasks))
     
-    return success_count
+    return sum(results)
 
 def main():
     """メイン関数"""
@@ -163,13 +194,14 @@ def main():
     logger.info(f"画質設定: {args.quality}")
     logger.info(f"最大長辺: {args.max_size}px")
     logger.info(f"再帰処理: {'有効' if args.recursive else '無効'}")
+    logger.info(f"ワーカー数: {args.workers or os.cpu_count()}")
     
     # ディレクトリの作成
     os.makedirs(args.output, exist_ok=True)
     
     # 処理の実行
     success_count = process_directory(
-        args.input, args.output, args.format, args.quality, args.max_size, args.recursive
+        args.input, args.output, args.format, args.quality, args.max_size, args.recursive, args.workers
     )
     
     logger.info(f"処理完了: {success_count}ファイルが正常に変換されました")
@@ -0,0 +1,49 @@
+"""
+image_files.py - 画像ファイルの走査処理（anthropic_image_converter.py と optimized_image_sender.py で共通）
+"""
+
+import os
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# サポートされるファイル拡張子
+SUPPORTED_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.webp'})
+JPEG_EXTENSIONS = frozenset({'.jpg', '.jpeg'})
+
+# ファイル名の末尾と比較するためのドットなし拡張子
+SUPPORTED_EXTENSIONS_NOPREFIX = frozenset(ext.lstrip('.') for ext in SUPPORTED_EXTENSIONS)
+
+def _has_supported_extension(name):
+    """
+    ファイル名の拡張子がサポート対象かどうか
+    
+    Path.suffixと同様に、ドットを含まない名前（jpg）やドットファイル（.png）は拡張子なしとして扱う。
+    """
+    stem, dot, ext = name.rpartition('.')
+    return bool(dot and stem) and ext.lower() in SUPPORTED_EXTENSIONS_NOPREFIX
+
+def scan_image_files(directory, recursive):
+    """
+    os.scandirでディレクトリを走査し、画像ファイルのパスとファイルサイズを返す
+    
+    rglobと同様に、読み込めないディレクトリやファイルはスキップする。
+    """
+    try:
+        entries = os.scandir(directory)
+    except OSError as e:
+        logger.warning(f"ディレクトリを読み込めないためスキップします: {directory}: {e}")
+        return
+    
+    with entries:
+        for entry in entries:
+            try:
+                # シンボリックリンクのディレクトリはrglobと同様にたどらない
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        yield from scan_image_files(entry.path, recursive)
+                elif _has_supported_extension(entry.name) and entry.is_file():
+                    yield Path(entry.path), entry.stat().st_size
+            except OSError as e:
+                logger.warning(f"ファイル情報を取得できないためスキップします: {entry.path}: {e}")
@@ -0,0 +1,248 @@
+"""
+image_processing.py - 画像の最適化処理（anthropic_image_converter.py と optimized_image_sender.py で共通）
+
+Pillow・NumPy・OpenCV・PyTurboJPEGは起動時間を短くするため使用する関数内でインポートする。
+"""
+
+import io
+import os
+import logging
+import importlib
+import threading
+from functools import lru_cache
+from pathlib import Path
+from image_files import JPEG_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Anthropic APIの制限値
+MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
+MAX_DIMENSION = 1568  # ピクセル単位の最大長辺
+OPTIMAL_QUALITY = 90  # 出力JPEG品質
+JPEG_QUALITY_STEP = 10  # 5MBを超えた場合に下げるJPEG品質の幅
+JPEG_ENCODE_ATTEMPTS = 3  # JPEGエンコードの最大試行回数（初回を含む）
+
+_TJ = None  # プロセスごとに共有するTurboJPEGインスタンス（遅延初期化）
+_TJ_UNAVAILABLE = False  # PyTurboJPEGまたはlibturbojpegが使えない場合にTrue
+_TLS = threading.local()  # スレッドごとに再利用するエンコード用バッファ
+
+@lru_cache(maxsize=None)
+def optional_import(name):
+    """
+    オプションの依存モジュールを初回使用時にインポートする（インストールされていなければNone）
+    
+    - numpy: 透過画像の合成に使う
+    - cv2: ndarrayのリサイズに使う
+    - turbojpeg: JPEG→JPEG変換でlibjpeg-turboを直接使う
+    - httpx: HTTP/2で1本の接続に多重化して送信する
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+def resized_size(width, height, max_dimension):
+    """最大長辺に収まるリサイズ後のサイズを計算する（リサイズ不要ならNone）"""
+    # 既に最大長辺以下ならリサイズ不要
+    if width <= max_dimension and height <= max_dimension:
+        return None
+    
+    # アスペクト比を維持しながらリサイズ
+    if width > height:
+        new_width = max_dimension
+        new_height = int(height * (max_dimension / width))
+    else:
+        new_height = max_dimension
+        new_width = int(width * (max_dimension / height))
+    
+    return new_width, new_height
+
+def resize_image(image, max_dimension):
+    """画像を指定された最大長辺に合わせてリサイズする"""
+    from PIL import Image
+    
+    new_size = resized_size(image.width, image.height, max_dimension)
+    if new_size is None:
+        return image
+    
+    return image.resize(new_size, Image.LANCZOS)
+
+def resize_array(arr, max_dimension):
+    """ndarrayの画像を最大長辺に合わせてリサイズする（OpenCVがなければPillowを使う）"""
+    height, width = arr.shape[:2]
+    new_size = resized_size(width, height, max_dimension)
+    if new_size is None:
+        return arr
+    
+    cv2 = optional_import('cv2')
+    if cv2 is None:
+        import numpy as np
+        from PIL import Image
+        return np.asarray(Image.fromarray(arr).resize(new_size, Image.LANCZOS))
+    
+    # 縮小のみなのでINTER_AREA（高速かつモアレが出にくい）を使う
+    return cv2.resize(arr, new_size, interpolation=cv2.INTER_AREA)
+
+def composite_on_white(img):
+    """RGBA画像の透明部分を白背景で合成してRGB画像にする"""
+    from PIL import Image
+    
+    np = optional_import('numpy')
+    if np is None:
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    
+    # out = (rgb * a + 255 * (255 - a)) / 255 を四捨五入で一括計算する（+127を足してもuint16に収まる）
+    arr = np.asarray(img, dtype=np.uint8)
+    rgb = arr[..., :3].astype(np.uint16)
+    alpha = arr[..., 3:4].astype(np.uint16)
+    out = (rgb * alpha + 255 * (255 - alpha) + 127) // 255
+    return Image.fromarray(out.astype(np.uint8))
+
+def reusable_buffer():
+    """
+    スレッドごとに再利用するBytesIOを先頭に戻して返す
+    
+    truncate()するとBytesIOは確保済みの領域を解放してしまうため、位置だけを戻して
+    書き込み、有効な長さはencoded_view・encoded_bytesでtell()から求める。
+    """
+    buffer = getattr(_TLS, 'buffer', None)
+    if buffer is None:
+        buffer = _TLS.buffer = io.BytesIO()
+    buffer.seek(0)
+    return buffer
+
+def encoded_view(buffer):
+    """
+    再利用バッファに書き込まれた先頭からtell()までをコピーせずにmemoryviewで返す
+    
+    ビューを解放するまでバッファには書き込めないため、使い終わったらrelease()すること。
+    """
+    return buffer.getbuffer()[:buffer.tell()]
+
+def encoded_bytes(buffer):
+    """再利用バッファに書き込まれた先頭からtell()までのデータを取り出す"""
+    with buffer.getbuffer() as view:
+        return view[:buffer.tell()].tobytes()
+
+def encode_jpeg_pillow(img, quality):
+    """
+    PillowでJPEGにエンコードし、再利用バッファのmemoryviewを返す
+    
+    まずHuffman最適化なしで高速にエンコードし、5MBを超えた場合のみ
+    optimize=Trueで品質を段階的に下げて再エンコードする。
+    """
+    for attempt in range(JPEG_ENCODE_ATTEMPTS):
+        buffer = reusable_buffer()
+        img.save(buffer, format='JPEG', quality=max(1, quality - attempt * JPEG_QUALITY_STEP),
+                 optimize=attempt > 0)
+        if buffer.tell() <= MAX_FILE_SIZE_BYTES:
+            break
+    
+    return encoded_view(buffer)
+
+def _tj():
+    """プロセス内で共有するTurboJPEGインスタンスを返す（利用できない場合はNone）"""
+    global _TJ, _TJ_UNAVAILABLE
+    if _TJ is None and not _TJ_UNAVAILABLE:
+        turbojpeg = optional_import('turbojpeg')
+        if turbojpeg is None:
+            _TJ_UNAVAILABLE = True
+            return None
+        try:
+            _TJ = turbojpeg.TurboJPEG()
+        except (OSError, RuntimeError) as e:
+            # libturbojpegが見つからない場合は以降Pillowのみで処理する
+            logger.warning(f"TurboJPEGを初期化できないためPillowで処理します: {e}")
+            _TJ_UNAVAILABLE = True
+    return _TJ
+
+def turbojpeg_available():
+    """PyTurboJPEGとlibturbojpegが使えるかどうか（初回呼び出し時に初期化する）"""
+    return _tj() is not None
+
+def init_worker(use_turbojpeg):
+    """ワーカープロセスの初期化: 親プロセスで確認したTurboJPEGの可否を引き継ぐ"""
+    global _TJ_UNAVAILABLE
+    if use_turbojpeg:
+        _tj()
+    else:
+        # 親プロセスで警告済みなので、ワーカーごとに初期化を試して同じ警告を出さない
+        _TJ_UNAVAILABLE = True
+
+def _decode_jpeg(path):
+    """PyTurboJPEGでJPEGファイルをRGBのndarrayにデコードする"""
+    from turbojpeg import TJPF_RGB
+    
+    with open(path, 'rb') as f:
+        return _tj().decode(f.read(), pixel_format=TJPF_RGB)
+
+def _encode_jpeg(arr, quality):
+    """
+    RGBのndarrayをPyTurboJPEGでJPEGバイト列にエンコードする
+    
+    encode_jpeg_pillowと同様に、5MBを超えた場合は品質を段階的に下げて再エンコードする。
+    """
+    from turbojpeg import TJPF_RGB, TJSAMP_420
+    
+    for attempt in range(JPEG_ENCODE_ATTEMPTS):
+        data = _tj().encode(arr, quality=max(1, quality - attempt * JPEG_QUALITY_STEP),
+                            pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420)
+        if len(data) <= MAX_FILE_SIZE_BYTES:
+            break
+    
+    return data
+
+def use_turbojpeg(input_path, output_format):
+    """PyTurboJPEGの高速パスを使えるかどうか"""
+    return (output_format.lower() == 'jpg'
+            and Path(input_path).suffix.lower() in JPEG_EXTENSIONS
+            and turbojpeg_available())
+
+def optimize_jpeg_turbo(input_path, quality, max_dimension):
+    """
+    JPEG→JPEG変換をPyTurboJPEGで行い、バイト列と (幅, 高さ) を返す
+    
+    CMYKなどデコードできない場合は (None, None) を返す。
+    """
+    try:
+        arr = _decode_jpeg(input_path)
+    except OSError as e:
+        # CMYKなどlibjpeg-turboでRGBに展開できない画像はPillowで処理する
+        logger.debug(f"TurboJPEGでデコードできないためPillowで処理します: {input_path}: {e}")
+        return None, None
+    
+    arr = resize_array(arr, max_dimension)
+    height, width = arr.shape[:2]
+    return _encode_jpeg(arr, quality), (width, height)
+
+def read_passthrough_jpeg(input_path, output_format, quality, max_dimension, input_size=None):
+    """
+    既にAPIの要件を満たすJPEGなら元のバイト列と (幅, 高さ) を返す（再エンコード不要）
+    
+    ヘッダーのみを読んで判定するため、画素データはデコードしない。
+    品質を指定された場合と、EXIF（位置情報を含むことがある）を持つ場合は、
+    従来どおり再エンコードするため (None, None) を返す。input_sizeを渡すとstatを省略する。
+    """
+    if quality != OPTIMAL_QUALITY:
+        return None, None
+    if output_format.lower() != 'jpg' or Path(input_path).suffix.lower() not in JPEG_EXTENSIONS:
+        return None, None
+    if input_size is None:
+        input_size = os.stat(input_path).st_size
+    if input_size > MAX_FILE_SIZE_BYTES:
+        return None, None
+    
+    from PIL import Image
+    
+    with Image.open(input_path) as img:
+        if img.format != 'JPEG' or img.mode != 'RGB' or max(img.size) > max_dimension:
+            return None, None
+        # 再エンコードではEXIFが削除されるため、EXIF付きの画像はそのまま出力しない
+        if 'exif' in img.info:
+            return None, None
+        size = img.size
+    
+    with open(input_path, 'rb') as f:
+        return f.read(), size
@@ -9,21 +9,35 @@ APIはOpenAPI仕様に従って実装されており、エンベディングを
 python optimized_image_sender.py --input <入力画像パス> --api-url <API URL> --api-key <API KEY>
 """
 
+from __future__ import annotations
+
 import os
 import sys
 import argparse
 import json
 import base64
 import logging
-import requests
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, Union, List, Tuple
-from PIL import Image
-import io
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Dict, Any, Optional, Union, List, Tuple
+from image_files import SUPPORTED_EXTENSIONS, scan_image_files
+from image_processing import (
+    MAX_FILE_SIZE_BYTES, MAX_DIMENSION, OPTIMAL_QUALITY, optional_import,
+    resized_size, resize_image, composite_on_white, encode_jpeg_pillow, reusable_buffer, encoded_bytes,
+    turbojpeg_available, init_worker, use_turbojpeg, optimize_jpeg_turbo, read_passthrough_jpeg,
+)
 
-# 環境変数の読み込み
-load_dotenv()
+# requests・Pillow・python-dotenvは起動時間を短くするため使用する関数内でインポートする
+# オプションのhttpxも同様にoptional_importで初回使用時に読み込む
+if TYPE_CHECKING:
+    import httpx
+    import requests
+    from PIL import Image
+    
+    # API送信に使うHTTPクライアント（httpxがなければrequests.Session）
+    HttpClient = Union[requests.Session, httpx.Client]
 
 # ロギング設定
 logging.basicConfig(
@@ -33,21 +47,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Anthropic APIの制限値
-MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
-MAX_DIMENSION = 1568  # ピクセル単位の最大長辺
-OPTIMAL_QUALITY = 90  # 出力JPEG品質
-
-# デフォルトのAPIエンドポイント設定
-API_HOST = os.environ.get("API_HOST", "http://localhost:1880")
-REGISTER_IMAGE_ENDPOINT = os.environ.get("REGISTER_IMAGE_ENDPOINT", "/image-embed")
-DEFAULT_API_KEY = os.environ.get("API_KEY", "")
-
-# APIエンドポイントの完全URL
-DEFAULT_API_ENDPOINT = f"{API_HOST}{REGISTER_IMAGE_ENDPOINT}"
-
-# API設定をログに出力
-logger.info(f"API設定: API_HOST={API_HOST}, ENDPOINT={REGISTER_IMAGE_ENDPOINT}, URL={DEFAULT_API_ENDPOINT}")
+# 環境変数が未設定の場合のAPIエンドポイント設定
+DEFAULT_API_HOST = "http://localhost:1880"
+DEFAULT_REGISTER_IMAGE_ENDPOINT = "/image-embed"
 
 # MIMEタイプマッピング
 MIME_TYPE_MAP = {
@@ -58,6 +60,26 @@ MIME_TYPE_MAP = {
     'gif': 'image/gif'
 }
 
+# 画像バイナリデータとして受け付けるバッファ型（base64.b64encodeとファイル書き込みが扱える）
+ImageData = Union[bytes, bytearray, memoryview]
+
+# 1回のバッチ送信でまとめる画像数のデフォルト値（バッチ送信はAPIが対応している場合のみ指定する）
+DEFAULT_BATCH_SIZE = 1
+
+# 並列アップロードのスレッド数とHTTPコネクションプールのサイズ
+UPLOAD_WORKERS = 8
+HTTP_POOL_SIZE = 16
+
+# 最適化済みで送信中または送信待ちの状態を許すバッチ数（メモリ使用量の上限）
+# 送信スレッドがすべて使えるようにUPLOAD_WORKERSと同じ数にする
+UPLOAD_PREFETCH = UPLOAD_WORKERS
+
+# バッチ送信を受け付けないと判定したステータスコード
+BATCH_REJECTED_STATUS_CODES = {400, 404, 405, 413, 415, 422}
+
+# バッチ送信を拒否された、またはバッチ送信でサーバーエラーになったAPIエンドポイント（以降は1枚ずつ送信する）
+_BATCH_REJECTED_URLS = set()
+
 def parse_args():
     """コマンドライン引数を解析する"""
     parser = argparse.ArgumentParser(description='画像を最適化してAPIに送信する')
@@ -82,7 +104,10 @@ def parse_args():
     api_group.add_argument('--api-key', '-k', help='API認証キー')
     api_group.add_argument('--metadata', '-m', help='追加のメタデータを含むJSONファイル')
     api_group.add_argument('--include-base64', action='store_true',
-                        help='メタデータにbase64データを含める')
+                        help='メタデータにもbase64データを含める（画像データが重複して送信サイズが約2倍になる）')
+    api_group.add_argument('--batch-size', '-b', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'1回のリクエストでまとめて送信する画像数。2以上はAPIが {{"images": [...]}} 形式に'
+                             f'対応している場合のみ指定する (default: {DEFAULT_BATCH_SIZE})')
     
     # 出力関連の引数
     output_group = parser.add_argument_group('出力オプション')
@@ -101,51 +126,70 @@ def get_image_files(directory, recursive=False):
     
     # ディレクトリでない場合は単一ファイルとして扱う
     if not directory_path.is_dir():
-        if directory_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
+        if directory_path.suffix.lower() in SUPPORTED_EXTENSIONS:
             return [directory_path]
         else:
             logger.error(f"サポートされていないファイル形式です: {directory}")
             return []
     
     # ディレクトリ内のファイルを検索
-    if recursive:
-        files = []
-        for path in directory_path.rglob('*'):
-            if path.is_file() and path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                files.append(path)
-    else:
-        files = [f for f in directory_path.iterdir() 
-                if f.is_file() and f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']]
-    
-    return sorted(files)
+    return sorted(path for path, _ in scan_image_files(directory_path, recursive))
 
-def resize_image(image, max_dimension):
-    """画像を指定された最大長辺に合わせてリサイズする"""
-    width, height = image.size
-    
-    # 既に最大長辺以下ならリサイズ不要
-    if width <= max_dimension and height <= max_dimension:
-        return image
-    
-    # アスペクト比を維持しながらリサイズ
-    if width > height:
-        new_width = max_dimension
-        new_height = int(height * (max_dimension / width))
-    else:
-        new_height = max_dimension
-        new_width = int(width * (max_dimension / height))
-    
-    return image.resize((new_width, new_height), Image.LANCZOS)
+def _optimize_pillow(
+    input_path: Union[str, Path],
+    output_format: str,
+    quality: int,
+    max_dimension: int
+) -> Tuple[bytes, Tuple[int, int]]:
+    """Pillowで画像を最適化してバイトデータと (幅, 高さ) を返す"""
+    from PIL import Image
+    
+    # 画像を開く
+    with Image.open(input_path) as img:
+        # JPEGはデコード時に1/2・1/4・1/8で縮小させ、デコードとリサイズの処理量を減らす
+        target_size = resized_size(img.width, img.height, max_dimension)
+        if img.format == 'JPEG' and target_size is not None:
+            img.draft('RGB', target_size)
+        
+        # RGBAモードの画像をRGBに変換（必要な場合）
+        if img.mode == 'RGBA' and output_format.lower() == 'jpg':
+            # 透明部分を白背景で変換
+            img = composite_on_white(img)
+        
+        # 画像をリサイズ
+        resized_img = resize_image(img, max_dimension)
+        
+        if output_format.lower() == 'jpg':
+            if resized_img.mode != 'RGB':
+                resized_img = resized_img.convert('RGB')
+            with encode_jpeg_pillow(resized_img, quality) as encoded:
+                return encoded.tobytes(), resized_img.size
+        
+        # メモリ上のバッファ（スレッドごとに再利用）
+        buffer = reusable_buffer()
+        
+        # 保存
+        if output_format.lower() == 'png':
+            resized_img.save(buffer, format='PNG', optimize=True)
+        elif output_format.lower() == 'webp':
+            resized_img.save(buffer, format='WEBP', quality=quality)
+        
+        # バッファの内容を取得
+        return encoded_bytes(buffer), resized_img.size
 
 def optimize_image_memory(
     input_path: Union[str, Path],
     output_format: str = 'jpg',
     quality: int = OPTIMAL_QUALITY,
     max_dimension: int = MAX_DIMENSION
-) -> Tuple[Optional[bytes], Optional[Image.Image]]:
+) -> Tuple[Optional[bytes], Optional[Tuple[int, int]]]:
     """
     画像を最適化してメモリ上に保持する
     
+    既に要件を満たすJPEGは、品質がデフォルトでEXIFがなければ再エンコードせずに元のデータを使う。
+    JPEG→JPEG変換はPyTurboJPEGがインストールされていればそちらで処理し、
+    それ以外の形式はPillowで処理する。
+    
     Args:
         input_path: 入力画像ファイルのパス
         output_format: 出力フォーマット（jpg, png, webp）
@@ -153,58 +197,76 @@ def optimize_image_memory(
         max_dimension: 最大長辺ピクセル数
     
     Returns:
-        Tuple[Optional[bytes], Optional[Image.Image]]: 最適化された画像のバイトデータとPILイメージオブジェクト
+        Tuple[Optional[bytes], Optional[Tuple[int, int]]]: 最適化された画像のバイトデータと (幅, 高さ)
     """
     try:
-        # 画像を開く
-        with Image.open(input_path) as img:
-            # RGBAモードの画像をRGBに変換（必要な場合）
-            if img.mode == 'RGBA' and output_format.lower() == 'jpg':
-                # 透明部分を白背景で変換
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[3])  # 3はアルファチャンネル
-                img = background
-            
-            # 画像をリサイズ
-            resized_img = resize_image(img, max_dimension)
-            
-            # メモリ上にバッファを作成
-            buffer = io.BytesIO()
-            
-            # 保存
-            if output_format.lower() == 'jpg':
-                resized_img = resized_img.convert('RGB')
-                resized_img.save(buffer, format='JPEG', quality=quality, optimize=True)
-            elif output_format.lower() == 'png':
-                resized_img.save(buffer, format='PNG', optimize=True)
-            elif output_format.lower() == 'webp':
-                resized_img.save(buffer, format='WEBP', quality=quality)
-            
-            # バッファの内容を取得
-            buffer.seek(0)
-            image_data = buffer.getvalue()
-            
-            # ファイルサイズをチェック
-            file_size = len(image_data)
-            if file_size > MAX_FILE_SIZE_BYTES:
-                logger.warning(f"警告: 画像サイズが {file_size/1024/1024:.2f}MB で制限の5MBを超えています")
-            
-            logger.info(f"処理完了: {Path(input_path).name}")
-            logger.info(f"  サイズ: {file_size/1024:.1f}KB, 寸法: {resized_img.width}x{resized_img.height}px")
-            
-            # 最適化された画像のバイナリデータとPILオブジェクトを返す
-            return image_data, resized_img
+        # 要件を満たすJPEGはそのまま使い、それ以外のJPEG→JPEGはPyTurboJPEGで処理する
+        image_data, size = read_passthrough_jpeg(input_path, output_format, quality, max_dimension)
+        if image_data is None and use_turbojpeg(input_path, output_format):
+            image_data, size = optimize_jpeg_turbo(input_path, quality, max_dimension)
+        
+        if image_data is None:
+            image_data, size = _optimize_pillow(input_path, output_format, quality, max_dimension)
+        
+        # ファイルサイズをチェック
+        file_size = len(image_data)
+        if file_size > MAX_FILE_SIZE_BYTES:
+            logger.warning(f"警告: 画像サイズが {file_size/1024/1024:.2f}MB で制限の5MBを超えています")
+        
+        logger.info(f"処理完了: {Path(input_path).name}")
+        logger.info(f"  サイズ: {file_size/1024:.1f}KB, 寸法: {size[0]}x{size[1]}px")
+        
+        # 最適化された画像のバイナリデータと寸法を返す
+        return image_data, size
             
     except Exception as e:
         logger.error(f"エラー: {input_path} の処理中にエラーが発生しました: {e}")
         return None, None
 
-def image_to_base64(image_data: bytes) -> str:
-    """画像バイナリデータをbase64エンコードする"""
-    return base64.b64encode(image_data).decode('utf-8')
+def build_payload(
+    image_data: ImageData,
+    content_type: str,
+    metadata: Dict[str, Any]
+) -> bytes:
+    """
+    APIリクエストボディのJSONをバイト列として組み立てる
+    
+    base64データをstrに変換してからjson.dumpsに渡すと同じデータが何度も
+    コピーされるため、b64encodeの結果をそのままJSONのバイト列に埋め込む。
+    
+    Args:
+        image_data: 画像バイナリデータ（bytesまたはmemoryviewなどのバッファ）
+        content_type: 画像のMIMEタイプ
+        metadata: 追加のメタデータ
+    
+    Returns:
+        bytes: JSONエンコードされたリクエストボディ
+    """
+    return b''.join((
+        b'{"content_type": ', json.dumps(content_type).encode('utf-8'),
+        b', "metadata": ', json.dumps(metadata).encode('utf-8'),
+        b', "image_base64": "', base64.b64encode(image_data), b'"}'
+    ))
+
+def build_batch_payload(images: List[Dict[str, Any]]) -> bytes:
+    """
+    複数画像をまとめたバッチ送信用のリクエストボディを組み立てる
+    
+    Args:
+        images: prepare_imageが返す画像情報のリスト
+    
+    Returns:
+        bytes: {"images": [...]} 形式のJSONエンコードされたリクエストボディ
+    """
+    return b''.join((
+        b'{"images": [',
+        b', '.join(build_payload(image["image_data"], image["content_type"], image["metadata"])
+                   for image in images),
+        b']}'
+    ))
 
 def save_optimized_image(
-    image_data: bytes,
+    image_data: ImageData,
     output_dir: Union[str, Path],
     original_path: Union[str, Path],
     output_format: str = 'jpg'
@@ -213,7 +275,7 @@ def save_optimized_image(
     最適化された画像を指定ディレクトリに保存する
     
     Args:
-        image_data: 画像バイナリデータ
+        image_data: 画像バイナリデータ（bytesまたはmemoryviewなどのバッファ）
         output_dir: 出力ディレクトリ
         original_path: 元の画像パス（相対パス計算用）
         output_format: 出力フォーマット
@@ -242,21 +304,23 @@ def save_optimized_image(
         return None
 
 def send_to_api(
-    base64_data: str,
+    image_data: ImageData,
     content_type: str,
     api_url: str,
     api_key: str,
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    session: Optional[HttpClient] = None
 ) -> Optional[Dict[str, Any]]:
     """
-    Base64エンコードした画像をAPIに送信する
+    画像をBase64エンコードしてAPIに送信する
     
     Args:
-        base64_data: Base64エンコードされた画像データ
+        image_data: 画像バイナリデータ（bytesまたはmemoryviewなどのバッファ）
         content_type: 画像のMIMEタイプ
         api_url: APIエンドポイントURL
         api_key: APIキー
         metadata: 追加のメタデータ
+        session: 接続を再利用するHTTPクライアント（省略時は都度接続）
     
     Returns:
         Optional[Dict[str, Any]]: APIレスポンス（エラー時はNone）
@@ -265,11 +329,7 @@ def send_to_api(
         metadata = {}
     
     # リクエストボディの準備
-    payload = {
-        "content_type": content_type,
-        "image_base64": base64_data,
-        "metadata": metadata
-    }
+    payload = build_payload(image_data, content_type, metadata)
     
     # ヘッダーの準備（認証含む）
     headers = {
@@ -280,30 +340,134 @@ def send_to_api(
     try:
         # APIリクエスト送信
         logger.info(f"APIリクエスト送信: {api_url}")
-        response = requests.post(api_url, json=payload, headers=headers)
+        response = _post(session, api_url, payload, headers)
         
         # レスポンスをチェック
-        if response.status_code == 200:
-            logger.info("API呼び出し成功!")
-            return response.json()
-            
-        elif response.status_code == 401:
-            logger.error("認証エラー: APIキーが必要です")
-            return None
-            
-        elif response.status_code == 403:
-            logger.error("認証エラー: 不正なAPIキー")
-            return None
-            
-        else:
-            logger.error(f"APIエラー: ステータスコード {response.status_code}")
-            logger.error(f"レスポンス: {response.text[:1000]}")
-            return None
+        return _check_response(response)
             
     except Exception as e:
         logger.error(f"APIリクエスト送信中にエラーが発生しました: {e}")
         return None
 
+def create_http_client() -> HttpClient:
+    """
+    API送信用にコネクションを再利用するHTTPクライアントを作成する
+    
+    httpx（h2を含む）がインストールされていればHTTP/2クライアントを使い、
+    複数のアップロードを1本の接続に多重化する。それ以外はrequests.Sessionを使う。
+    """
+    httpx = optional_import('httpx')
+    if httpx is not None:
+        # httpxはリクエストごとにINFOログを出すため、アップロードごとのログと重複しないよう抑える
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        try:
+            # requestsと同様にタイムアウトなし（大きなバッチの送信に時間がかかるため）
+            return httpx.Client(http2=True, limits=httpx.Limits(max_connections=HTTP_POOL_SIZE), timeout=None)
+        except ImportError as e:
+            logger.warning(f"HTTP/2を利用できないためrequestsで送信します: {e}")
+    
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _post(session: Optional[HttpClient], api_url: str, payload: bytes, headers: Dict[str, str]) -> Any:
+    """HTTPクライアントの種類に合わせてPOSTリクエストを送信する"""
+    httpx = optional_import('httpx')
+    if httpx is not None and isinstance(session, httpx.Client):
+        return session.post(api_url, content=payload, headers=headers)
+    if session is None:
+        import requests
+        session = requests
+    return session.post(api_url, data=payload, headers=headers)
+
+def _check_response(response: Any) -> Optional[Any]:
+    """APIレスポンスのステータスコードを確認し、成功時はJSONを返す"""
+    if response.status_code == 200:
+        logger.info("API呼び出し成功!")
+        return response.json()
+        
+    elif response.status_code == 401:
+        logger.error("認証エラー: APIキーが必要です")
+        return None
+        
+    elif response.status_code == 403:
+        logger.error("認証エラー: 不正なAPIキー")
+        return None
+        
+    else:
+        logger.error(f"APIエラー: ステータスコード {response.status_code}")
+        logger.error(f"レスポンス: {response.text[:1000]}")
+        return None
+
+def send_batch_to_api(
+    images: List[Dict[str, Any]],
+    api_url: str,
+    api_key: str,
+    session: Optional[HttpClient] = None
+) -> Optional[List[Optional[Dict[str, Any]]]]:
+    """
+    複数の画像を1回のリクエストでAPIに送信する
+    
+    APIがバッチ形式に対応していないと判定できた場合のみNoneを返し、呼び出し側は
+    1枚ずつ送信し直す。それ以外の失敗（認証エラー、サーバーエラー、通信エラー、
+    画像ごとに対応づけられないレスポンス）は再送せず、全画像を失敗として扱う。
+    
+    Args:
+        images: prepare_imageが返す画像情報のリスト
+        api_url: APIエンドポイントURL
+        api_key: APIキー
+        session: 接続を再利用するHTTPクライアント（省略時は都度接続）
+    
+    Returns:
+        Optional[List[Optional[Dict[str, Any]]]]: 画像ごとのAPIレスポンス（失敗した画像はNone）。
+            バッチ形式に対応していない場合はNone
+    """
+    failed = [None] * len(images)
+    payload = build_batch_payload(images)
+    headers = {
+        "Content-Type": "application/json",
+        "api-key": api_key
+    }
+    
+    try:
+        logger.info(f"APIバッチリクエスト送信: {api_url} ({len(images)}件)")
+        response = _post(session, api_url, payload, headers)
+        
+        # バッチ形式を受け付けないエンドポイントには以降1枚ずつ送信する
+        if response.status_code in BATCH_REJECTED_STATUS_CODES:
+            logger.warning(f"バッチ送信が受け付けられませんでした (ステータスコード {response.status_code})。"
+                           "1枚ずつ送信します")
+            _BATCH_REJECTED_URLS.add(api_url)
+            return None
+        
+        # サーバーエラーの場合は同じ画像を再送せず、以降のバッチ送信もやめる
+        if response.status_code >= 500:
+            _BATCH_REJECTED_URLS.add(api_url)
+        
+        data = _check_response(response)
+        if data is None:
+            return failed
+            
+    except Exception as e:
+        logger.error(f"APIバッチリクエスト送信中にエラーが発生しました: {e}")
+        return failed
+    
+    # {"results": [...]} または画像ごとのレスポンスのリストを想定する
+    results = data.get("results") if isinstance(data, dict) else data
+    if isinstance(results, list) and len(results) == len(images):
+        return results
+    
+    # 画像ごとに対応づけられないレスポンスは登録されたか判断できないため失敗として扱う
+    logger.error("バッチ送信のレスポンスを画像ごとに対応づけられません。"
+                 f"APIが {{\"images\": [...]}} 形式に対応しているか確認してください: {str(data)[:1000]}")
+    _BATCH_REJECTED_URLS.add(api_url)
+    return failed
+
 def save_api_response(response: Dict[str, Any], output_file: Union[str, Path]) -> bool:
     """
     APIレスポンスをJSONファイルに保存する
@@ -351,35 +515,29 @@ def load_metadata(metadata_file: Optional[Union[str, Path]]) -> Dict[str, Any]:
         logger.error(f"メタデータファイルの読み込み中にエラーが発生しました: {e}")
         return {}
 
-def process_image(
+def prepare_image(
     input_path: Union[str, Path],
-    api_url: str,
-    api_key: str,
     output_format: str = 'jpg',
     quality: int = OPTIMAL_QUALITY,
     max_dimension: int = MAX_DIMENSION,
     metadata: Optional[Dict[str, Any]] = None,
     save_optimized_dir: Optional[Union[str, Path]] = None,
-    save_response_path: Optional[Union[str, Path]] = None,
-    include_base64_in_metadata: bool = True
-) -> bool:
+    include_base64_in_metadata: bool = False
+) -> Optional[Dict[str, Any]]:
     """
-    画像を処理し、最適化してAPIに送信する
+    画像を最適化し、API送信に必要な情報をまとめる
     
     Args:
         input_path: 入力画像ファイルのパス
-        api_url: APIエンドポイントURL
-        api_key: APIキー
         output_format: 出力フォーマット
         quality: 画質設定
         max_dimension: 最大長辺ピクセル数
         metadata: 追加のメタデータ
         save_optimized_dir: 最適化画像を保存するディレクトリ
-        save_response_path: APIレスポンスを保存するパス
-        include_base64_in_metadata: メタデータにbase64データを含めるかどうか
+        include_base64_in_metadata: メタデータにもbase64データを含めるかどうか
     
     Returns:
-        bool: 処理が成功したかどうか
+        Optional[Dict[str, Any]]: path, content_type, image_data, metadata を含む辞書（エラー時はNone）
     """
     # メタデータがなければ空の辞書を使用
     if metadata is None:
@@ -395,7 +553,7 @@ def process_image(
     # 画像を最適化
     image_data, _ = optimize_image_memory(input_path, output_format, quality, max_dimension)
     if not image_data:
-        return False
+        return None
     
     # 最適化画像を保存（必要な場合）
     if save_optimized_dir:
@@ -403,39 +561,263 @@ def process_image(
         if saved_path:
             metadata.update({"optimized_path": str(saved_path)})
     
-    # Base64エンコード
-    base64_data = image_to_base64(image_data)
-    
     # メタデータにbase64データを追加（オプション）
     if include_base64_in_metadata:
-        metadata.update({"image_base64": base64_data})
+        metadata.update({"image_base64": base64.b64encode(image_data).decode('ascii')})
     
     # MIMEタイプを決定
     content_type = MIME_TYPE_MAP.get(output_format.lower(), 'image/jpeg')
     
-    # APIに送信
-    response = send_to_api(base64_data, content_type, api_url, api_key, metadata)
-    if not response:
+    return {
+        "path": file_path,
+        "content_type": content_type,
+        "image_data": image_data,
+        "metadata": metadata
+    }
+
+def save_image_response(
+    response: Dict[str, Any],
+    save_response_path: Union[str, Path],
+    input_path: Union[str, Path]
+) -> bool:
+    """画像ごとのAPIレスポンスを保存する（ディレクトリ指定時はファイル名を生成）"""
+    response_path = Path(save_response_path)
+    if response_path.is_dir() or not response_path.suffix:
+        response_path = response_path / f"{Path(input_path).stem}_response.json"
+    
+    return save_api_response(response, response_path)
+
+def send_images(
+    images: List[Dict[str, Any]],
+    api_url: str,
+    api_key: str,
+    save_response_path: Optional[Union[str, Path]] = None,
+    session: Optional[HttpClient] = None
+) -> int:
+    """
+    準備済みの画像をAPIに送信する
+    
+    複数画像の場合はまずバッチ送信を試み、APIがバッチ形式に対応していなければ1枚ずつ送信する。
+    
+    Args:
+        images: prepare_imageが返す画像情報のリスト
+        api_url: APIエンドポイントURL
+        api_key: APIキー
+        save_response_path: APIレスポンスを保存するパス
+        session: 接続を再利用するHTTPクライアント
+    
+    Returns:
+        int: 送信に成功した画像数
+    """
+    responses = None
+    if len(images) > 1 and api_url not in _BATCH_REJECTED_URLS:
+        responses = send_batch_to_api(images, api_url, api_key, session)
+    
+    if responses is None:
+        responses = [
+            send_to_api(image["image_data"], image["content_type"], api_url, api_key, image["metadata"], session)
+            for image in images
+        ]
+    
+    success_count = 0
+    for image, response in zip(images, responses):
+        if not response:
+            continue
+        success_count += 1
+        
+        # APIレスポンスを保存（必要な場合）
+        if save_response_path:
+            save_image_response(response, save_response_path, image["path"])
+    
+    return success_count
+
+def process_image(
+    input_path: Union[str, Path],
+    api_url: str,
+    api_key: str,
+    output_format: str = 'jpg',
+    quality: int = OPTIMAL_QUALITY,
+    max_dimension: int = MAX_DIMENSION,
+    metadata: Optional[Dict[str, Any]] = None,
+    save_optimized_dir: Optional[Union[str, Path]] = None,
+    save_response_path: Optional[Union[str, Path]] = None,
+    session: Optional[HttpClient] = None,
+    include_base64_in_metadata: bool = False
+) -> bool:
+    """
+    画像を処理し、最適化してAPIに送信する
+    
+    Args:
+        input_path: 入力画像ファイルのパス
+        api_url: APIエンドポイントURL
+        api_key: APIキー
+        output_format: 出力フォーマット
+        quality: 画質設定
+        max_dimension: 最大長辺ピクセル数
+        metadata: 追加のメタデータ
+        save_optimized_dir: 最適化画像を保存するディレクトリ
+        save_response_path: APIレスポンスを保存するパス
+        session: 接続を再利用するHTTPクライアント
+        include_base64_in_metadata: メタデータにもbase64データを含めるかどうか
+    
+    Returns:
+        bool: 処理が成功したかどうか
+    """
+    image = prepare_image(input_path, output_format, quality, max_dimension, metadata, save_optimized_dir,
+                          include_base64_in_metadata)
+    if image is None:
         return False
     
-    # APIレスポンスを保存（必要な場合）
-    if save_response_path:
-        # ディレクトリが指定された場合はファイル名を生成
-        response_path = Path(save_response_path)
-        if response_path.is_dir() or not response_path.suffix:
-            response_path = response_path / f"{file_path.stem}_response.json"
+    return send_images([image], api_url, api_key, save_response_path, session) == 1
+
+def process_images(
+    image_files: List[Path],
+    api_url: str,
+    api_key: str,
+    output_format: str = 'jpg',
+    quality: int = OPTIMAL_QUALITY,
+    max_dimension: int = MAX_DIMENSION,
+    metadata: Optional[Dict[str, Any]] = None,
+    save_optimized_dir: Optional[Union[str, Path]] = None,
+    save_response_path: Optional[Union[str, Path]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_base64_in_metadata: bool = False
+) -> int:
+    """
+    複数の画像を最適化してAPIに送信する
+    
+    最適化はプロセスプール、送信はスレッドプールで行い、CPU処理とネットワーク待ちを
+    重ねる。処理中の画像は、最適化中のワーカー数分に加えて、送信中・送信待ちの
+    batch_size * UPLOAD_PREFETCH 件までに制限する。
+    
+    Args:
+        image_files: 入力画像ファイルのリスト
+        api_url: APIエンドポイントURL
+        api_key: APIキー
+        output_format: 出力フォーマット
+        quality: 画質設定
+        max_dimension: 最大長辺ピクセル数
+        metadata: 各画像に共通の追加メタデータ
+        save_optimized_dir: 最適化画像を保存するディレクトリ
+        save_response_path: APIレスポンスを保存するパス
+        batch_size: 1回のリクエストでまとめて送信する画像数
+        include_base64_in_metadata: メタデータにもbase64データを含めるかどうか
+    
+    Returns:
+        int: 送信に成功した画像数
+    """
+    if metadata is None:
+        metadata = {}
+    batch_size = max(1, batch_size)
+    
+    # 最適化を投入してから送信が終わるまでの画像数を制限する
+    # （ワーカーを遊ばせないよう、バッチにまとめている途中の画像も含めてワーカー数分は確保する）
+    cpu_workers = os.cpu_count() or 1
+    in_flight = threading.BoundedSemaphore(max(cpu_workers, batch_size) + batch_size * UPLOAD_PREFETCH)
+    optimized = queue.Queue()
+    
+    # 接続を再利用するHTTPクライアントを作成
+    session = create_http_client()
+    
+    def submit_optimizations(cpu_executor: ProcessPoolExecutor) -> None:
+        """上限に空きができるたびに最適化処理を投入する"""
+        for index, image_file in enumerate(image_files):
+            in_flight.acquire()
+            logger.info(f"処理中: {image_file}")
+            try:
+                future = cpu_executor.submit(
+                    prepare_image,
+                    image_file,
+                    output_format,
+                    quality,
+                    max_dimension,
+                    metadata.copy(),  # コピーを渡して個別に更新可能にする
+                    save_optimized_dir,
+                    include_base64_in_metadata
+                )
+            except Exception as e:
+                # ワーカーの異常終了でプールが停止した場合は、残りの画像を失敗として通知する
+                logger.error(f"画像の最適化処理を投入できませんでした: {e}")
+                in_flight.release()
+                for _ in range(len(image_files) - index):
+                    optimized.put(None)
+                return
+            future.add_done_callback(optimized.put)
+    
+    def submit_upload(io_executor: ThreadPoolExecutor, images: List[Dict[str, Any]]) -> Future:
+        """送信処理を投入し、完了時に上限の枠を解放する"""
+        future = io_executor.submit(send_images, images, api_url, api_key, save_response_path, session)
+        future.add_done_callback(lambda _: in_flight.release(len(images)))
+        return future
+    
+    uploads = []
+    pending = []
+    
+    # TurboJPEGの可否は親プロセスで一度だけ確認し、ワーカーに引き継ぐ
+    with session, \
+            ProcessPoolExecutor(max_workers=cpu_workers, initializer=init_worker,
+                                initargs=(turbojpeg_available(),)) as cpu_executor, \
+            ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as io_executor:
+        producer = threading.Thread(target=submit_optimizations, args=(cpu_executor,), daemon=True)
+        producer.start()
+        
+        # 最適化が完了した順にバッチにまとめて送信する
+        for _ in range(len(image_files)):
+            future = optimized.get()
+            if future is None:
+                # 投入できなかった画像は上限の枠を使っていない
+                continue
+            
+            try:
+                image = future.result()
+            except Exception as e:
+                logger.error(f"画像の最適化中にエラーが発生しました: {e}")
+                image = None
+            
+            if image is None:
+                in_flight.release()
+                continue
+            
+            pending.append(image)
+            if len(pending) >= batch_size:
+                uploads.append(submit_upload(io_executor, pending))
+                pending = []
+        
+        if pending:
+            uploads.append(submit_upload(io_executor, pending))
         
-        save_api_response(response, response_path)
+        producer.join()
+        return sum(future.result() for future in uploads)
+
+def load_api_settings() -> Tuple[str, str]:
+    """
+    環境変数（.envファイルを含む）からデフォルトのAPI設定を読み込む
+    
+    Returns:
+        Tuple[str, str]: APIエンドポイントの完全URLとAPIキー
+    """
+    from dotenv import load_dotenv
+    
+    # 環境変数の読み込み
+    load_dotenv()
+    
+    api_host = os.environ.get("API_HOST", DEFAULT_API_HOST)
+    register_image_endpoint = os.environ.get("REGISTER_IMAGE_ENDPOINT", DEFAULT_REGISTER_IMAGE_ENDPOINT)
+    api_endpoint = f"{api_host}{register_image_endpoint}"
     
-    return True
+    # API設定をログに出力
+    logger.info(f"API設定: API_HOST={api_host}, ENDPOINT={register_image_endpoint}, URL={api_endpoint}")
+    
+    return api_endpoint, os.environ.get("API_KEY", "")
 
 def main():
     """メイン関数"""
     args = parse_args()
     
     # APIエンドポイントの設定
-    api_url = args.api_url or DEFAULT_API_ENDPOINT
-    api_key = args.api_key or DEFAULT_API_KEY
+    default_api_endpoint, default_api_key = load_api_settings()
+    api_url = args.api_url or default_api_endpoint
+    api_key = args.api_key or default_api_key
     
     if not api_key:
         logger.error("APIキーが設定されていません。--api-key オプションか環境変数で指定してください。")
@@ -454,31 +836,22 @@ def main():
     else:
         image_files = [Path(args.input)]
     
-    # 各画像を処理
-    success_count = 0
-    error_count = 0
-    
-    for image_file in image_files:
-        logger.info(f"処理中: {image_file}")
-        
-        # 画像処理とAPI送信
-        success = process_image(
-            image_file,
-            api_url,
-            api_key,
-            args.format,
-            args.quality,
-            args.max_size,
-            metadata.copy(),  # コピーを渡して個別に更新可能にする
-            args.save_optimized,
-            args.save_response,
-            args.include_base64
-        )
-        
-        if success:
-            success_count += 1
-        else:
-            error_count += 1
+    # 画像の最適化とAPI送信
+    success_count = process_images(
+        image_files,
+        api_url,
+        api_key,
+        args.format,
+        args.quality,
+        args.max_size,
+        metadata,
+        args.save_optimized,
+        args.save_response,
+        args.batch_size,
+        args.include_base64
+    )
+    
+    error_count = len(image_files) - success_count
     
     # 処理結果のサマリーを表示
     logger.info(f"処理完了: 成功={success_count}, 失敗={error_count}, 合計={len(image_files)}")